@@ -4,29 +4,87 @@ import subprocess
 import shutil
 import re
 import traceback
+import threading
 import random
-import json
+import hashlib
+import functools
+import time
+import queue
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from PyQt6.QtWidgets import (QApplication, QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QFileDialog, 
                              QLabel, QProgressBar, QMessageBox, QTextEdit, QFrame,
                              QSlider, QSpinBox, QLineEdit, QScrollArea)
 from PyQt6.QtCore import QThread, pyqtSignal, Qt
-from PyQt6.QtGui import QFont
+from PyQt6.QtGui import QFont, QTextCursor
 
 # --- FFmpeg Availability Check ---
 def check_ffmpeg():
-    """Checks if ffmpeg and ffprobe are installed and available in the system's PATH."""
-    return shutil.which("ffmpeg"), shutil.which("ffprobe")
-
-# --- Media Info Probe ---
-def get_media_info(filepath, ffprobe_path):
-    """Uses ffprobe to check if a file has an audio stream."""
-    command = [ffprobe_path, '-v', 'quiet', '-print_format', 'json', '-show_streams', '-select_streams', 'a', filepath]
+    """Checks if ffmpeg is installed and available in the system's PATH."""
+    return shutil.which("ffmpeg")
+
+# --- Hardware Encoder Detection ---
+# H.264 encoders in order of preference, with the options that favour speed on each and how many
+# encodes may run at once (GPU drivers cap concurrent sessions; None means one per CPU core).
+# Every entry sets its rate control explicitly to roughly match libx264's CRF 23; left to their
+# own defaults the hardware encoders fall back to very low bitrates (200 kb/s for VideoToolbox).
+VIDEO_ENCODERS = [
+    ('h264_nvenc', ['-preset', 'p4', '-tune', 'll', '-rc', 'vbr', '-cq', '23', '-b:v', '0'], 3),
+    ('h264_qsv', ['-preset', 'veryfast', '-global_quality', '23'], 4),
+    ('h264_videotoolbox', ['-realtime', '1', '-b:v', '6M'], 4),
+    ('h264_amf', ['-quality', 'speed', '-rc', 'cqp', '-qp_i', '23', '-qp_p', '23', '-qp_b', '23'], 4),
+    ('libx264', ['-preset', 'ultrafast', '-tune', 'zerolatency', '-crf', '23'], None),
+]
+
+@functools.lru_cache(maxsize=None)
+def detect_video_encoder():
+    """Returns (name, options, max_sessions) for the fastest H.264 encoder that actually works on this machine."""
     try:
-        result = subprocess.run(command, capture_output=True, text=True, check=True, encoding='utf-8')
-        info = json.loads(result.stdout)
-        return {'has_audio': bool(info.get('streams'))}
-    except (subprocess.CalledProcessError, json.JSONDecodeError, KeyError):
-        return {'has_audio': False}
+        listed = subprocess.run(['ffmpeg', '-hide_banner', '-encoders'], capture_output=True, text=True, encoding='utf-8', errors='ignore').stdout
+    except OSError:
+        listed = ""
+    for name, options, max_sessions in VIDEO_ENCODERS[:-1]:
+        if name not in listed: continue
+        # Being compiled in doesn't mean there's a usable GPU/driver, so encode one test frame
+        # with the exact options the real encodes will use
+        test_command = ['ffmpeg', '-hide_banner', '-f', 'lavfi', '-i', 'color=c=black:s=256x256:d=0.1',
+                        '-frames:v', '1', '-pix_fmt', 'yuv420p', '-c:v', name] + options + ['-f', 'null', '-']
+        if subprocess.run(test_command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL).returncode == 0:
+            return name, options, max_sessions
+    return VIDEO_ENCODERS[-1]
+
+# --- Source Folder Scan ---
+VIDEO_EXTENSIONS = ('.mp4', '.mov', '.avi', '.mkv')
+
+def iter_video_files(root):
+    """Yields every supported video file under root, recursively."""
+    # scandir's DirEntry already knows whether it's a directory, so no extra stat per file
+    stack = [root]
+    while stack:
+        # Like os.walk, skip directories that can't be listed (or fail partway) instead of aborting the scan
+        try:
+            with os.scandir(stack.pop()) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False): stack.append(entry.path)
+                    elif entry.name.lower().endswith(VIDEO_EXTENSIONS): yield entry.path
+        except OSError:
+            continue
+
+class FolderScanWorker(QThread):
+    found = pyqtSignal(list)
+
+    def __init__(self, folder):
+        super().__init__()
+        self.folder = folder
+
+    def run(self):
+        files = []
+        try:
+            files.extend(iter_video_files(self.folder))
+        except Exception:
+            pass
+        # Always report back, even with a partial list, so the UI never stays stuck on "Scanning..."
+        # Sorted so a given seed picks the same files regardless of directory listing order
+        self.found.emit(sorted(files))
 
 # --- Worker Thread for FFmpeg Processing ---
 class VideoWorker(QThread):
@@ -34,150 +92,293 @@ class VideoWorker(QThread):
     log_message = pyqtSignal(str)
     finished = pyqtSignal(str, bool) 
 
-    def __init__(self, settings, video_files, ffprobe_path):
+    def __init__(self, settings, video_files):
         super().__init__()
         self.settings = settings
         self.video_files = video_files
-        self.ffprobe_path = ffprobe_path
-        self.video_info_cache = {}
+        self.video_codec_args = ['-c:v', VIDEO_ENCODERS[-1][0]] + VIDEO_ENCODERS[-1][1]
+        self.max_encodes = None
+        self._last_progress_ts = 0
+        # Drawn within the Seed spinbox's range (0 there means random) so a logged seed can be typed back in
+        self._project_seed = settings.get('seed') or random.randint(1, 2**31 - 1)
 
     def run(self):
         temp_dir = os.path.join(self.settings['output_folder'], "temp_clips")
+        muxer = None
         try:
             self.log_message.emit("Preparing for generation...")
             os.makedirs(temp_dir, exist_ok=True)
-            
-            self.log_message.emit("Scanning video files for audio information...")
-            self._cache_video_info()
+
+            encoder, encoder_options, self.max_encodes = detect_video_encoder()
+            self.video_codec_args = ['-c:v', encoder] + encoder_options
+            self.log_message.emit(f"Using video encoder: {encoder}")
+            self.log_message.emit(f"Project seed: {self._project_seed}")
 
             scenes = self._plan_scenes()
             if not scenes:
                 self.finished.emit("Failed to plan any scenes. Check your duration settings.", False)
                 return
 
-            clip_paths = []
             total_scenes = len(scenes)
+            clip_paths = [None] * total_scenes
 
-            # STAGE 1: Create each scene as a separate temporary file
+            # STAGE 0: Decode, scale and encode each source used by the plan exactly once.
+            # Single scenes are just their proxy, so they never need a separate encode.
+            proxies = self._build_proxies(scenes, temp_dir)
             for i, scene in enumerate(scenes):
-                self.progress.emit(int((i / total_scenes) * 100), f"Processing Scene {i+1}/{total_scenes} ({scene['type']})")
-                output_clip_path = os.path.join(temp_dir, f"clip_{i:04d}.ts")
-                self._create_scene_clip(scene, output_clip_path)
-                clip_paths.append(output_clip_path)
-
-            # STAGE 2: Concatenate all temporary clips
-            self.progress.emit(95, "Concatenating all scenes...")
-            concat_list_path = os.path.join(temp_dir, "concat_list.txt")
-            with open(concat_list_path, "w", encoding='utf-8') as f:
-                for path in clip_paths:
-                    f.write(f"file '{os.path.basename(path)}'\n")
-            
+                if scene['type'] == 'single': clip_paths[i] = proxies[scene['vids'][0]]
+
+            # STAGE 2 runs alongside Stage 1: one muxer reads MPEG-TS on stdin and stream-copies it.
+            # TS is concatenable by byte-append, so clips are fed to it in order as soon as they're
+            # ready and deleted straight after, instead of piling up for a concat-list pass at the end.
             final_command = [
-                'ffmpeg', '-y', '-f', 'concat', '-safe', '0', '-i', concat_list_path,
+                'ffmpeg', '-y', '-f', 'mpegts', '-i', 'pipe:0',
                 '-c', 'copy', self.settings['output_path']
             ]
-            self.log_message.emit(f"\nFinal concatenation command: {' '.join(final_command)}")
-            
-            # Execute the final concatenation
-            process = subprocess.Popen(
-                final_command, cwd=temp_dir, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
-                universal_newlines=True, creationflags=subprocess.CREATE_NO_WINDOW if sys.platform == 'win32' else 0,
-                encoding='utf-8', errors='ignore'
+            self.log_message.emit(f"\nFinal muxing command: {' '.join(final_command)}")
+            muxer = subprocess.Popen(
+                final_command, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                creationflags=subprocess.CREATE_NO_WINDOW if sys.platform == 'win32' else 0
             )
-            for line in process.stdout: self.log_message.emit(line.strip())
-            process.wait()
+            muxer_log = threading.Thread(target=self._pump_output, args=(muxer,), daemon=True)
+            muxer_log.start()
 
-            if process.returncode == 0:
+            # Grid scenes that draw the same sources in the same layout only need encoding once;
+            # every copy is fed from the first one's clip, which is deleted after its last use.
+            first_use, copies = {}, {}
+            for i, scene in enumerate(scenes):
+                if scene['type'] == 'single': continue
+                first = first_use.setdefault((scene['type'], tuple(sorted(scene['vids']))), i)
+                copies.setdefault(first, []).append(i)
+            last_use = {os.path.join(temp_dir, f"clip_{first:04d}.ts"): uses[-1] for first, uses in copies.items()}
+            try:
+                next_clip = self._feed_ready_clips(muxer, clip_paths, 0, last_use)
+
+                # STAGE 1: Compose each unique grid scene from its proxies, several at a time.
+                # The pool is bounded (see _pool_size) so the encodes together don't oversubscribe the CPU.
+                if copies:
+                    max_workers = self._pool_size(len(copies))
+                    grid_count = sum(len(uses) for uses in copies.values())
+                    self.log_message.emit(f"Encoding {len(copies)} unique grid scenes ({grid_count} total) with {max_workers} parallel workers...")
+
+                    def on_grid_done(done, first):
+                        nonlocal next_clip
+                        for i in copies[first]: clip_paths[i] = os.path.join(temp_dir, f"clip_{first:04d}.ts")
+                        self._emit_progress(40 + int((done / len(copies)) * 55), f"Processed Grid Scene {done}/{len(copies)} ({scenes[first]['type']})", force=done == len(copies))
+                        next_clip = self._feed_ready_clips(muxer, clip_paths, next_clip, last_use)
+
+                    self._run_pool({first: (self._create_scene_clip, scenes[first], proxies, os.path.join(temp_dir, f"clip_{first:04d}.ts")) for first in copies}, on_grid_done)
+
+                self.progress.emit(95, "Finalizing output...")
+                muxer.stdin.close()
+            except OSError as e:
+                # Writes fail once the muxer has exited early (e.g. no format for the output name, or an
+                # unwritable destination); its exit code and log say why better than a broken pipe does
+                try:
+                    muxer.wait(timeout=5)
+                except subprocess.TimeoutExpired:
+                    raise e from None
+            muxer.wait()
+            muxer_log.join()
+
+            if muxer.returncode == 0:
                 self.progress.emit(100, "Done!")
                 self.finished.emit("Video generation successful!", True)
             else:
-                self.finished.emit(f"Final concatenation failed with exit code {process.returncode}.", False)
+                self.finished.emit(f"Final muxing failed with exit code {muxer.returncode}.", False)
 
         except Exception as e:
             self.finished.emit(f"An error occurred: {e}\n{traceback.format_exc()}", False)
         finally:
+            if muxer and muxer.poll() is None:
+                muxer.kill()
+                muxer.wait()
             if os.path.exists(temp_dir):
                 shutil.rmtree(temp_dir)
 
-    def _cache_video_info(self):
-        for vid in self.video_files:
-            if vid not in self.video_info_cache:
-                self.video_info_cache[vid] = get_media_info(vid, self.ffprobe_path)
+    def _pool_size(self, tasks):
+        """Number of encodes to run at once: one per two cores, capped at the encoder's session limit."""
+        # Each encode runs a 2-thread encoder plus single-threaded decoders and filters (see _encode_args)
+        return min(max(1, (os.cpu_count() or 1) // 2), self.max_encodes or tasks, tasks)
+
+    def _run_pool(self, jobs, on_done):
+        """Runs {key: (func, *args)} jobs on a pool of _pool_size workers, calling on_done(done_count, key) as each finishes."""
+        with ThreadPoolExecutor(max_workers=self._pool_size(len(jobs))) as executor:
+            futures = {executor.submit(*job): key for key, job in jobs.items()}
+            try:
+                for done, future in enumerate(as_completed(futures), start=1):
+                    future.result()
+                    on_done(done, futures[future])
+            except BaseException:
+                # Report the failure now instead of sitting through every queued job first
+                executor.shutdown(cancel_futures=True)
+                raise
+
+    def _emit_progress(self, value, text, force=False):
+        # Parallel workers can finish in bursts; cap updates at ~10 Hz so they don't flood the GUI event queue
+        now = time.monotonic()
+        if force or now - self._last_progress_ts >= 0.1:
+            self.progress.emit(value, text)
+            self._last_progress_ts = now
+
+    def _pump_output(self, process):
+        """Forwards a process's output to the log in batches at most every 100 ms, instead of one signal per line."""
+        # A separate reader blocks on the pipe, so a batch still goes out on time while the process
+        # is quiet (e.g. the muxer waiting on stdin). select() would do this, but not on Windows pipes.
+        fd, chunks = process.stdout.fileno(), queue.Queue()
+        def read():
+            for chunk in iter(lambda: os.read(fd, 65536), b""): chunks.put(chunk)
+            chunks.put(None)
+        threading.Thread(target=read, daemon=True).start()
+
+        pending, batch, last_emit = b"", [], time.monotonic()
+        while True:
+            try:
+                chunk = chunks.get(timeout=0.1)
+            except queue.Empty:
+                chunk = b""
+            if chunk is None: break
+            # ffmpeg redraws its stats line with \r, so treat that as a line break too
+            *lines, pending = re.split(rb"[\r\n]", pending + chunk)
+            batch.extend(text for text in (line.decode('utf-8', errors='ignore').strip() for line in lines) if text)
+            if batch and time.monotonic() - last_emit >= 0.1:
+                self.log_message.emit("\n".join(batch))
+                batch, last_emit = [], time.monotonic()
+        if pending.strip(): batch.append(pending.decode('utf-8', errors='ignore').strip())
+        if batch: self.log_message.emit("\n".join(batch))
+
+    def _feed_ready_clips(self, muxer, clip_paths, next_clip, last_use):
+        """Writes every clip that's ready, in scene order, to the muxer. Returns the index of the first one still pending."""
+        while next_clip < len(clip_paths) and clip_paths[next_clip]:
+            with open(clip_paths[next_clip], "rb") as f:
+                shutil.copyfileobj(f, muxer.stdin, 1024 * 1024)
+            # Grid clips go once their last scene is sent; proxies aren't in last_use and stay until cleanup
+            if last_use.get(clip_paths[next_clip]) == next_clip: os.remove(clip_paths[next_clip])
+            next_clip += 1
+        return next_clip
 
     def _plan_scenes(self):
         scene_duration = self.settings['scene_duration']
         if scene_duration <= 0: return []
         num_scenes = self.settings['total_duration'] // scene_duration
-        scenes, available_layouts = [], ['2x2', '3x3']
-        for _ in range(num_scenes):
-            if random.randint(1, 100) <= self.settings['layout_mix']:
-                scenes.append({'type': random.choice(available_layouts)})
+        # Draw every scene's layout in one call: 'layout_mix'% grids, split evenly between 2x2 and 3x3
+        grid_weight = self.settings['layout_mix'] / 2
+        layouts = random.Random(self._project_seed).choices(['single', '2x2', '3x3'], weights=[100 - self.settings['layout_mix'], grid_weight, grid_weight], k=num_scenes)
+
+        # Pick each scene's sources up front so the proxy pass knows which files are actually used.
+        # Each scene gets its own generator, so the same seed always reproduces the same plan.
+        scenes = []
+        for scene_idx, layout in enumerate(layouts):
+            rng = random.Random(scene_idx ^ self._project_seed)
+            req_vids = {'single': 1, '2x2': 4, '3x3': 9}[layout]
+            if len(self.video_files) < req_vids:
+                scene_vids = [rng.choice(self.video_files) for _ in range(req_vids)]
             else:
-                scenes.append({'type': 'single'})
+                scene_vids = rng.sample(self.video_files, req_vids)
+            scenes.append({'type': layout, 'vids': scene_vids})
         return scenes
 
-    def _create_scene_clip(self, scene, output_path):
-        target_res = '1280x720'
+    def _build_proxies(self, scenes, temp_dir):
+        """Encodes every source used by the plan into a normalized proxy clip. Returns {source path: proxy path}."""
+        proxy_dir = os.path.join(temp_dir, "proxies")
+        os.makedirs(proxy_dir, exist_ok=True)
+        sources = list(dict.fromkeys(vid for scene in scenes for vid in scene['vids']))
+        proxies = {vid: os.path.join(proxy_dir, f"{hashlib.sha1(os.path.abspath(vid).encode('utf-8')).hexdigest()}.ts") for vid in sources}
+
+        max_workers = self._pool_size(len(sources))
+        self.log_message.emit(f"Preparing {len(sources)} source videos with {max_workers} parallel workers...")
+        self._run_pool({vid: (self._create_proxy, vid, proxies[vid]) for vid in sources},
+                       lambda done, vid: self._emit_progress(int((done / len(sources)) * 40), f"Prepared Source {done}/{len(sources)}", force=done == len(sources)))
+        return proxies
+
+    def _create_proxy(self, source_path, output_path):
+        # Proxies are full-frame scenes: 1280x720 with the clip volume already applied,
+        # so single scenes can be muxed as-is and grids only have to downscale and mix.
         scene_duration = str(self.settings['scene_duration'])
-        
-        inputs, video_filters, audio_filters = [], [], []
-        
-        # Determine videos needed for the scene
-        req_vids = 1
-        if scene['type'] == '2x2': req_vids = 4
-        elif scene['type'] == '3x3': req_vids = 9
-        
-        if len(self.video_files) < req_vids:
-            scene_vids = [random.choice(self.video_files) for _ in range(req_vids)]
-        else:
-            scene_vids = random.sample(self.video_files, req_vids)
-        
-        # Add inputs
-        for path in scene_vids: inputs.extend(['-i', path])
+        video_filter = "scale=1280:720:force_original_aspect_ratio=decrease,pad=1280:720:-1:-1:color=black,setsar=1"
+        audio_filter = f"volume={self.settings['clip_vol']},aresample=async=1"
+
+        # Assume the source has audio rather than probing it up front. If it doesn't, ffmpeg rejects
+        # the map before encoding anything and the proxy gets a silent track instead, so every clip
+        # has the same streams and the final mux can stream-copy. Any other failure is a real error.
+        command = ['ffmpeg', '-y', '-threads', '1', '-i', source_path,
+                   '-vf', video_filter, '-af', audio_filter,
+                   '-map', '0:v:0', '-map', '0:a:0'] + self._encode_args(output_path)
+        result = self._run_ffmpeg(command, check=False)
+        if result.returncode != 0:
+            if b"Stream map '0:a:0' matches no streams" not in result.stderr: self._check_ffmpeg(result)
+            command = ['ffmpeg', '-y', '-threads', '1', '-i', source_path,
+                       '-f', 'lavfi', '-t', scene_duration, '-i', 'anullsrc=r=48000:cl=stereo',
+                       '-vf', video_filter,
+                       '-map', '0:v:0', '-map', '1:a'] + self._encode_args(output_path)
+            self._run_ffmpeg(command)
+
+    def _create_scene_clip(self, scene, proxies, output_path):
+        inputs, video_filters = [], []
+        req_vids = len(scene['vids'])
+        for path in scene['vids']: inputs.extend(['-threads', '1', '-i', proxies[path]])
 
         # Build video filter chain
-        if scene['type'] == 'single':
-            video_filters.append(f"[0:v]scale={target_res}:force_original_aspect_ratio=decrease,pad={target_res}:-1:-1:color=black,setpts=PTS-STARTPTS[vout]")
-        else: # Grids
-            grid_dim = 2 if scene['type'] == '2x2' else 3
-            tile_w, tile_h = 1280 // grid_dim, 720 // grid_dim
-            for i in range(req_vids):
-                video_filters.append(f"[{i}:v]scale={tile_w}:{tile_h}:force_original_aspect_ratio=decrease,pad={tile_w}:{tile_h}:-1:-1:color=black,setpts=PTS-STARTPTS[v{i}]")
-            
-            rows = [f"{''.join([f'[v{r*grid_dim+c}]' for c in range(grid_dim)])}hstack=inputs={grid_dim}[row{r}]" for r in range(grid_dim)]
-            video_filters.extend(rows)
-            video_filters.append(f"{''.join([f'[row{r}]' for r in range(grid_dim)])}vstack=inputs={grid_dim}[vout]")
-
-        # Build audio filter chain
-        vids_with_audio = [i for i, v in enumerate(scene_vids) if self.video_info_cache.get(v, {}).get('has_audio')]
-        if vids_with_audio:
-            audio_mix_inputs = "".join([f"[{i}:a]" for i in vids_with_audio])
-            audio_filters.append(f"{audio_mix_inputs}amix=inputs={len(vids_with_audio)},volume={self.settings['clip_vol']}[aout]")
-            map_audio = ['-map', '[aout]']
-        else:
-            map_audio = ['-an'] # No audio
+        grid_dim = 2 if scene['type'] == '2x2' else 3
+        tile_w, tile_h = 1280 // grid_dim, 720 // grid_dim
+        # Proxies are already 16:9 1280x720, so a plain constant-size scale fills the tile without
+        # letterboxing, and ffmpeg rebases each input to start at zero without a setpts node
+        for i in range(req_vids):
+            video_filters.append(f"[{i}:v]scale={tile_w}:{tile_h}:eval=init[v{i}]")
+
+        # One xstack node instead of a row of hstacks plus a vstack; tiles are all the same size
+        layout = "|".join(f"{c*tile_w}_{r*tile_h}" for r in range(grid_dim) for c in range(grid_dim))
+        # 1280 doesn't split evenly into thirds, so pad the grid back out to exactly 1280x720;
+        # every clip must share one resolution for the stream-copied mux to stay valid
+        video_filters.append(f"{''.join([f'[v{i}]' for i in range(req_vids)])}xstack=inputs={req_vids}:layout={layout},pad=1280:720:-1:-1:color=black,setsar=1[vout]")
+
+        # Build audio filter chain; every proxy has an audio track with the volume already applied
+        audio_mix_inputs = "".join([f"[{i}:a]" for i in range(req_vids)])
+        audio_filter = f"{audio_mix_inputs}amix=inputs={req_vids},aresample=async=1[aout]"
 
         command = ['ffmpeg', '-y'] + inputs + [
-            '-filter_complex', ";".join(video_filters + audio_filters),
-            '-map', '[vout]'] + map_audio + [
-            '-t', scene_duration,
-            '-c:v', 'libx264', '-c:a', 'aac', '-preset', 'medium', '-pix_fmt', 'yuv420p',
+            '-filter_complex', ";".join(video_filters + [audio_filter]),
+            '-map', '[vout]', '-map', '[aout]'] + self._encode_args(output_path)
+        self._run_ffmpeg(command)
+
+    def _run_ffmpeg(self, command, check=True):
+        """Runs an ffmpeg command with only errors captured. Returns the completed process; with check, a failure is logged and raised."""
+        command = command[:1] + ['-nostats', '-loglevel', 'error'] + command[1:]
+        result = subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        if check: self._check_ffmpeg(result)
+        return result
+
+    def _check_ffmpeg(self, result):
+        if result.returncode != 0:
+            self.log_message.emit(result.stderr.decode('utf-8', errors='ignore').strip())
+            raise subprocess.CalledProcessError(result.returncode, result.args)
+
+    def _encode_args(self, output_path):
+        """Output options shared by proxies and scene clips, so every clip has identical stream parameters."""
+        return [
+            '-t', str(self.settings['scene_duration']), '-r', '30',
+            *self.video_codec_args, '-threads', '2', '-pix_fmt', 'yuv420p',
+            # '-threads' above only caps the encoder; inputs are opened with '-threads 1' and
+            # the filter graphs are kept to one thread too, so _pool_size bounds the total
+            '-filter_threads', '1', '-filter_complex_threads', '1',
+            '-c:a', 'aac', '-ar', '48000', '-ac', '2',
+            '-avoid_negative_ts', 'make_zero',
             output_path
         ]
-        
-        subprocess.run(command, capture_output=True)
 
 
 # --- Main Application Window ---
 class App(QWidget):
     def __init__(self):
         super().__init__()
-        self.ffmpeg_path, self.ffprobe_path = check_ffmpeg()
+        self.ffmpeg_path = check_ffmpeg()
         
         self.video_files, self.destination_folder = [], os.getcwd()
+        self.worker, self.scan_worker = None, None
+        self.generating, self.scanning = False, False
         
         self.initUI()
-        if not self.ffmpeg_path or not self.ffprobe_path:
+        if not self.ffmpeg_path:
             self.show_ffmpeg_warning()
 
     def initUI(self):
@@ -200,7 +401,7 @@ class App(QWidget):
         # --- Sections ---
         main_layout.addWidget(self.create_section_header("1. Sources"))
         self.video_folder_label = QLabel('No source folder selected')
-        main_layout.addWidget(self.create_file_select_button('Select Source Folder (Recursive)', self.select_source_folder, self.video_folder_label))
+        main_layout.addWidget(self.create_file_select_button('Select Source Folder (Recursive)', self.select_source_folder, self.video_folder_label, "source_button"))
         main_layout.addWidget(self.create_separator())
 
         main_layout.addWidget(self.create_section_header("2. Output & Layout"))
@@ -223,6 +424,11 @@ class App(QWidget):
         self.output_name_edit = QLineEdit("compilation.mp4")
         name_layout.addWidget(QLabel("Output Filename:")); name_layout.addWidget(self.output_name_edit)
         main_layout.addLayout(name_layout)
+
+        seed_layout = QHBoxLayout()
+        self.seed_spinbox = QSpinBox(); self.seed_spinbox.setRange(0, 2147483647); self.seed_spinbox.setSpecialValueText("Random")
+        seed_layout.addWidget(QLabel("Seed:")); seed_layout.addWidget(self.seed_spinbox)
+        main_layout.addLayout(seed_layout)
         main_layout.addWidget(self.create_separator())
 
         main_layout.addWidget(self.create_section_header("3. Audio"))
@@ -258,8 +464,9 @@ class App(QWidget):
         setattr(self, attr_name, slider)
         return container
 
-    def create_file_select_button(self, text, callback, label_widget):
+    def create_file_select_button(self, text, callback, label_widget, attr_name):
         button = QPushButton(text); button.clicked.connect(lambda: callback(label_widget))
+        setattr(self, attr_name, button)
         container = QWidget(); layout = QVBoxLayout(container); layout.setContentsMargins(0,0,0,0)
         layout.addWidget(button); layout.addWidget(label_widget)
         return container
@@ -267,41 +474,65 @@ class App(QWidget):
     def select_source_folder(self, label):
         folder = QFileDialog.getExistingDirectory(self, "Select Source Folder")
         if folder:
-            label.setText(f"Folder: {os.path.basename(folder)}")
-            self.video_files = [os.path.join(r, f) for r, _, fs in os.walk(folder) for f in fs if f.lower().endswith(('.mp4', '.mov', '.avi', '.mkv'))]
-            self.video_folder_label.setText(f"{len(self.video_files)} videos found in {os.path.basename(folder)}")
+            label.setText(f"Scanning {os.path.basename(folder)}...")
+            self.scanning = True
+            self.source_button.setEnabled(False); self.generate_button.setEnabled(False)
+            # Large trees can take a while to walk, so scan off the GUI thread. The previous scan
+            # has already reported back, but let its thread return before dropping the reference.
+            if self.scan_worker: self.scan_worker.wait()
+            self.scan_worker = FolderScanWorker(folder)
+            self.scan_worker.found.connect(lambda files, f=folder: self.on_scan_finished(files, f))
+            self.scan_worker.start()
+
+    def on_scan_finished(self, files, folder):
+        self.video_files = files
+        self.video_folder_label.setText(f"{len(self.video_files)} videos found in {os.path.basename(folder)}")
+        self.scanning = False
+        self.source_button.setEnabled(True)
+        # A compilation may still be running off the previous file list; it re-enables Generate when done
+        if not self.generating: self.generate_button.setEnabled(True)
 
     def select_dest_folder(self):
         folder = QFileDialog.getExistingDirectory(self, "Select Destination Folder")
         if folder: self.destination_folder = folder; self.dest_folder_label.setText(f"Destination: {folder}")
             
     def generate_video(self):
-        if not self.ffmpeg_path or not self.ffprobe_path: self.show_ffmpeg_warning(); return
+        if not self.ffmpeg_path: self.show_ffmpeg_warning(); return
         if not self.video_files: QMessageBox.critical(self, "Input Error", "Please select a source folder."); return
 
         self.log_box.clear(); self.progress_bar.setValue(0); self.generate_button.setEnabled(False)
+        self.generating = True
 
         settings = {
             "layout_mix": self.layoutmix_slider.value(),
             "clip_vol": self.clipvolume_slider.value() / 100.0,
             "total_duration": self.total_length_spinbox.value(),
             "scene_duration": self.clip_length_spinbox.value(),
+            "seed": self.seed_spinbox.value(),
             "output_folder": self.destination_folder,
             "output_path": os.path.join(self.destination_folder, self.output_name_edit.text())
         }
 
-        self.worker = VideoWorker(settings, self.video_files, self.ffprobe_path)
-        self.worker.log_message.connect(self.log_box.append)
-        self.worker.progress.connect(self.update_progress)
-        self.worker.finished.connect(self.on_finished)
+        if self.worker: self.worker.wait()
+        self.worker = VideoWorker(settings, self.video_files)
+        self.worker.log_message.connect(self.append_log, Qt.ConnectionType.QueuedConnection)
+        self.worker.progress.connect(self.update_progress, Qt.ConnectionType.QueuedConnection)
+        self.worker.finished.connect(self.on_finished, Qt.ConnectionType.QueuedConnection)
         self.worker.start()
 
+    def append_log(self, text):
+        # Insert each batch as plain text at the end rather than append()ing it line by line
+        self.log_box.moveCursor(QTextCursor.MoveOperation.End)
+        self.log_box.insertPlainText(text + "\n")
+        self.log_box.ensureCursorVisible()
+
     def update_progress(self, value, text):
         self.progress_bar.setValue(value)
         self.status_label.setText(text)
 
     def on_finished(self, message, success):
-        self.generate_button.setEnabled(True)
+        self.generating = False
+        if not self.scanning: self.generate_button.setEnabled(True)
         self.status_label.setText("Finished.")
         if success:
             QMessageBox.information(self, "Success", message)
@@ -315,8 +546,8 @@ class App(QWidget):
             
     def show_ffmpeg_warning(self):
         msg = QMessageBox(self); msg.setIcon(QMessageBox.Icon.Warning)
-        msg.setText("FFmpeg and FFprobe Not Found")
-        msg.setInformativeText("This application requires FFmpeg and FFprobe to be installed and accessible in your system's PATH.\n\nPlease download it from ffmpeg.org and follow their installation instructions.\n\nAfter installing, you may need to restart this application.")
+        msg.setText("FFmpeg Not Found")
+        msg.setInformativeText("This application requires FFmpeg to be installed and accessible in your system's PATH.\n\nPlease download it from ffmpeg.org and follow their installation instructions.\n\nAfter installing, you may need to restart this application.")
         msg.setWindowTitle("FFmpeg Installation Required"); msg.setStandardButtons(QMessageBox.StandardButton.Ok)
         msg.exec()
 